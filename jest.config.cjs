@@ -8,6 +8,9 @@ module.exports = {
   },
   moduleFileExtensions: ['ts', 'tsx', 'js', 'jsx', 'json', 'node'],
   moduleNameMapper: {
-    '^~/(.*)$': '<rootDir>/src/$1'
+    // Sources import each other with NodeNext-style ".js" suffixes
+    '^~/(.*)\\.js$': '<rootDir>/src/$1',
+    '^~/(.*)$': '<rootDir>/src/$1',
+    '^(\\.{1,2}/.*)\\.js$': '$1'
   }
 };
@@ -3,11 +3,12 @@ import yargs from "yargs";
 import { hideBin } from "yargs/helpers";
 import { resolve } from "path";
 import type { FigmaAuthOptions } from "./services/figma.js";
+import type { OutputFormat } from "./utils/serialize.js";
 
 interface ServerConfig {
   auth: FigmaAuthOptions;
   port: number;
-  outputFormat: "yaml" | "json";
+  outputFormat: OutputFormat;
   configSources: {
     figmaApiKey: "cli" | "env";
     figmaOAuthToken: "cli" | "env" | "none";
@@ -28,6 +29,7 @@ interface CliArgs {
   env?: string;
   port?: number;
   json?: boolean;
+  "fast-json"?: boolean;
 }
 
 export function getServerConfig(isStdioMode: boolean): ServerConfig {
@@ -55,6 +57,11 @@ export function getServerConfig(isStdioMode: boolean): ServerConfig {
         description: "Output data from tools in JSON format instead of YAML",
         default: false,
       },
+      "fast-json": {
+        type: "boolean",
+        description: "Output data from tools in compact, unindented JSON (fastest for large files)",
+        default: false,
+      },
     })
     .help()
     .version(process.env.NPM_PACKAGE_VERSION ?? "unknown")
@@ -123,11 +130,14 @@ export function getServerConfig(isStdioMode: boolean): ServerConfig {
   }
 
   // Handle JSON output format
-  if (argv.json) {
+  if (argv["fast-json"]) {
+    config.outputFormat = "fastjson";
+    config.configSources.outputFormat = "cli";
+  } else if (argv.json) {
     config.outputFormat = "json";
     config.configSources.outputFormat = "cli";
   } else if (process.env.OUTPUT_FORMAT) {
-    config.outputFormat = process.env.OUTPUT_FORMAT as "yaml" | "json";
+    config.outputFormat = process.env.OUTPUT_FORMAT as OutputFormat;
     config.configSources.outputFormat = "env";
   }
 
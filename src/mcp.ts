@@ -2,8 +2,9 @@ import { McpServer } from "@modelcontextprotocol/sdk/server/mcp.js";
 import { z } from "zod";
 import { FigmaService, type FigmaAuthOptions } from "./services/figma.js";
 import type { SimplifiedDesign } from "./services/simplify-node-response.js";
-import yaml from "js-yaml";
 import { Logger } from "./utils/logger.js";
+import { serializeResult, type OutputFormat } from "./utils/serialize.js";
+import { isVisible, parseFigmaUrl } from "./utils/common.js";
 
 const serverInfo = {
   name: "Figma MCP Server",
@@ -12,7 +13,7 @@ const serverInfo = {
 
 type CreateServerOptions = {
   isHTTP?: boolean;
-  outputFormat?: "yaml" | "json";
+  outputFormat?: OutputFormat;
 };
 
 function createServer(
@@ -32,7 +33,7 @@ function createServer(
 function registerTools(
   server: McpServer,
   figmaService: FigmaService,
-  outputFormat: "yaml" | "json",
+  outputFormat: OutputFormat,
 ): void {
   // Tool to get file information
   server.tool(
@@ -42,13 +43,13 @@ function registerTools(
       fileKey: z
         .string()
         .describe(
-          "The key of the Figma file to fetch, often found in a provided URL like figma.com/(file|design)/<fileKey>/...",
+          "The key of the Figma file to fetch, often found in a provided URL like figma.com/(file|design)/<fileKey>/... A full Figma URL is also accepted.",
         ),
       nodeId: z
         .string()
         .optional()
         .describe(
-          "The ID of the node to fetch, often found as URL parameter node-id=<nodeId>, always use if provided",
+          "The ID of the node to fetch, often found as URL parameter node-id=<nodeId>, always use if provided. Multiple IDs may be separated by commas.",
         ),
       depth: z
         .number()
@@ -56,9 +57,16 @@ function registerTools(
         .describe(
           "OPTIONAL. Do NOT use unless explicitly requested by the user. Controls how many levels deep to traverse the node tree,",
         ),
+      refresh: z
+        .boolean()
+        .optional()
+        .describe(
+          "OPTIONAL. Fetch fresh data from Figma instead of reusing a response from the last few minutes, e.g. after the design was edited.",
+        ),
     },
-    async ({ fileKey, nodeId, depth }) => {
+    async ({ fileKey, nodeId, depth, refresh }) => {
       try {
+        ({ fileKey, nodeId } = resolveFileArgs(fileKey, nodeId));
         Logger.log(
           `Fetching ${
             depth ? `${depth} layers deep` : "all layers"
@@ -67,9 +75,9 @@ function registerTools(
 
         let file: SimplifiedDesign;
         if (nodeId) {
-          file = await figmaService.getNode(fileKey, nodeId, depth);
+          file = await figmaService.getNode(fileKey, nodeId, depth, refresh);
         } else {
-          file = await figmaService.getFile(fileKey, depth);
+          file = await figmaService.getFile(fileKey, depth, refresh);
         }
 
         Logger.log(`Successfully fetched file: ${file.name}`);
@@ -82,8 +90,7 @@ function registerTools(
         };
 
         Logger.log(`Generating ${outputFormat.toUpperCase()} result from file`);
-        const formattedResult =
-          outputFormat === "json" ? JSON.stringify(result, null, 2) : yaml.dump(result);
+        const formattedResult = serializeResult(result, outputFormat);
 
         Logger.log("Sending result to client");
         return {
@@ -106,7 +113,11 @@ function registerTools(
     "download_figma_images",
     "Download SVG and PNG images used in a Figma file based on the IDs of image or icon nodes",
     {
-      fileKey: z.string().describe("The key of the Figma file containing the node"),
+      fileKey: z
+        .string()
+        .describe(
+          "The key of the Figma file containing the node. A full Figma URL is also accepted.",
+        ),
       nodes: z
         .object({
           nodeId: z
@@ -159,6 +170,7 @@ function registerTools(
     },
     async ({ fileKey, nodes, localPath, svgOptions, pngScale }) => {
       try {
+        ({ fileKey } = resolveFileArgs(fileKey));
         const imageFills = nodes.filter(({ imageRef }) => !!imageRef) as {
           nodeId: string;
           imageRef: string;
@@ -216,26 +228,41 @@ function registerTools(
       fileKey: z
         .string()
         .describe(
-          "The key of the Figma file to analyze, often found in a provided URL like figma.com/(file|design)/<fileKey>/...",
+          "The key of the Figma file to analyze, often found in a provided URL like figma.com/(file|design)/<fileKey>/... A full Figma URL is also accepted.",
         ),
       nodeId: z
         .string()
         .optional()
         .describe(
-          "The ID of the specific node to analyze, often found as URL parameter node-id=<nodeId>",
+          "The ID of the specific node to analyze, often found as URL parameter node-id=<nodeId>. Multiple IDs may be separated by commas.",
+        ),
+      maxNodes: z
+        .number()
+        .int()
+        .positive()
+        .optional()
+        .describe(
+          "OPTIONAL. Stop after analyzing this many nodes for a quick preview of very large files. Shallow levels are analyzed first.",
+        ),
+      refresh: z
+        .boolean()
+        .optional()
+        .describe(
+          "OPTIONAL. Fetch fresh data from Figma instead of reusing a response from the last few minutes, e.g. after the design was edited.",
         ),
     },
-    async ({ fileKey, nodeId }) => {
+    async ({ fileKey, nodeId, maxNodes, refresh }) => {
       try {
+        ({ fileKey, nodeId } = resolveFileArgs(fileKey, nodeId));
         Logger.log(
           `Analyzing depth distribution for ${nodeId ? `node ${nodeId} from file` : `full file`} ${fileKey}`,
         );
 
         // Get raw data to analyze
-        const rawData = await figmaService.getRawData(fileKey, nodeId);
+        const rawData = await figmaService.getRawData(fileKey, nodeId, refresh);
         
         // Analyze depth distribution
-        const stats = analyzeDepthDistribution(rawData, nodeId);
+        const stats = analyzeDepthDistribution(rawData, nodeId, maxNodes);
         
         // Format analysis report
         const report = formatDepthAnalysis(stats);
@@ -256,6 +283,13 @@ function registerTools(
   );
 }
 
+// Accept a pasted Figma URL in place of a file key. An explicit nodeId wins over the URL's node-id.
+function resolveFileArgs(fileKey: string, nodeId?: string): { fileKey: string; nodeId?: string } {
+  const parsed = parseFigmaUrl(fileKey);
+  if (!parsed) return { fileKey, nodeId };
+  return { fileKey: parsed.fileKey, nodeId: nodeId ?? parsed.nodeId };
+}
+
 // Helper types for depth analysis
 interface DepthStats {
   maxDepth: number;
@@ -264,10 +298,11 @@ interface DepthStats {
   depthNodes: Record<number, Array<{ name: string; type: string }>>;
   depthCharCount: Record<number, number>;
   totalChars: number;
+  sampled: boolean;
 }
 
 // Analyze depth distribution
-function analyzeDepthDistribution(rawData: any, nodeId?: string): DepthStats {
+function analyzeDepthDistribution(rawData: any, nodeId?: string, maxNodes?: number): DepthStats {
   const stats: DepthStats = {
     maxDepth: 0,
     totalNodes: 0,
@@ -275,26 +310,43 @@ function analyzeDepthDistribution(rawData: any, nodeId?: string): DepthStats {
     depthNodes: {},
     depthCharCount: {},
     totalChars: 0,
+    sampled: false,
   };
 
-  let documentNode: any;
+  let documentNodes: any[];
   if (nodeId && rawData.nodes) {
-    const nodeKey = Object.keys(rawData.nodes)[0];
-    documentNode = rawData.nodes[nodeKey]?.document;
+    // Every requested node is a root at depth 0
+    documentNodes = Object.values(rawData.nodes).map((nodeResponse: any) => nodeResponse?.document);
   } else {
-    documentNode = rawData.document;
+    documentNodes = [rawData.document];
   }
 
-  if (documentNode) {
-    analyzeNode(documentNode, 0, stats);
+  // Walk breadth-first with a queue, so a sampled analysis still covers the shallow levels fully
+  const queue: Array<{ node: any; depth: number }> = documentNodes
+    .filter((node) => node && isVisible(node))
+    .map((node) => ({ node, depth: 0 }));
+  for (let head = 0; head < queue.length; head++) {
+    if (maxNodes !== undefined && stats.totalNodes >= maxNodes) {
+      stats.sampled = true;
+      break;
+    }
+
+    const { node, depth } = queue[head];
+    analyzeNode(node, depth, stats);
+
+    if (Array.isArray(node.children)) {
+      for (const child of node.children) {
+        if (child && isVisible(child)) {
+          queue.push({ node: child, depth: depth + 1 });
+        }
+      }
+    }
   }
 
   return stats;
 }
 
 function analyzeNode(node: any, depth: number, stats: DepthStats): void {
-  if (!node || (node.visible !== undefined && !node.visible)) return;
-
   // Update statistics
   stats.totalNodes++;
   stats.maxDepth = Math.max(stats.maxDepth, depth);
@@ -341,19 +393,15 @@ function analyzeNode(node: any, depth: number, stats: DepthStats): void {
   // Update character statistics
   stats.depthCharCount[depth] += nodeChars;
   stats.totalChars += nodeChars;
-
-  // Recursively process children
-  if (node.children && Array.isArray(node.children)) {
-    for (const child of node.children) {
-      analyzeNode(child, depth + 1, stats);
-    }
-  }
 }
 
 function formatDepthAnalysis(stats: DepthStats): string {
   let report = '📊 深度分析結果:\n';
   report += `   最大深度: ${stats.maxDepth}\n`;
   report += `   總節點數: ${stats.totalNodes}\n`;
+  if (stats.sampled) {
+    report += `   (取樣分析: 僅統計前 ${stats.totalNodes} 個節點，較深層級可能不完整)\n`;
+  }
   
   // Estimate size and tokens
   const totalSizeKb = stats.totalChars / 1024;
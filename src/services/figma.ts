@@ -9,7 +9,7 @@ import type {
 import { downloadFigmaImage } from "~/utils/common.js";
 import { Logger } from "~/utils/logger.js";
 import { fetchWithRetry } from "~/utils/fetch-with-retry.js";
-import yaml from "js-yaml";
+import { toYaml } from "~/utils/serialize.js";
 
 export type FigmaAuthOptions = {
   figmaApiKey: string;
@@ -17,6 +17,21 @@ export type FigmaAuthOptions = {
   useOAuth: boolean;
 };
 
+type CachedResponse = {
+  response: Promise<unknown>;
+  expiryTimer: NodeJS.Timeout;
+};
+
+// How long file and node responses are reused, e.g. between analyze_figma_depth and get_figma_data
+const RESPONSE_CACHE_TTL_MS = 5 * 60 * 1000;
+// Full file responses can take hundreds of MB once parsed, so only keep the latest two around
+const RESPONSE_CACHE_MAX_ENTRIES = 2;
+// Figma accepts many comma-separated IDs per /files/:key/nodes request. Lists are only split when
+// the ids parameter would get long enough to risk URL length limits.
+const MAX_NODE_IDS_LENGTH = 4000;
+// Split lists are requested this many batches at a time, to stay within Figma's rate limits
+const NODE_REQUEST_CONCURRENCY = 2;
+
 type FetchImageParams = {
   /**
    * The Node in Figma that will either be rendered or have its background image downloaded
@@ -44,32 +59,40 @@ export class FigmaService {
   private readonly oauthToken: string;
   private readonly useOAuth: boolean;
   private readonly baseUrl = "https://api.figma.com/v1";
+  /**
+   * Auth headers shared by every request. Node's fetch keeps connections to api.figma.com alive
+   * between calls, so a service instance only needs to build these once.
+   */
+  private readonly headers: Record<string, string>;
+  /**
+   * Recent file and node responses by endpoint. In-flight requests are stored too, so concurrent
+   * calls for the same data share one download. Entries are dropped by a timer once they expire.
+   */
+  private readonly responseCache = new Map<string, CachedResponse>();
 
   constructor({ figmaApiKey, figmaOAuthToken, useOAuth }: FigmaAuthOptions) {
     this.apiKey = figmaApiKey || "";
     this.oauthToken = figmaOAuthToken || "";
     this.useOAuth = !!useOAuth && !!this.oauthToken;
+
+    // Set auth headers based on authentication method
+    if (this.useOAuth) {
+      // Use OAuth token with Authorization: Bearer header
+      this.headers = { Authorization: `Bearer ${this.oauthToken}` };
+    } else {
+      // Use Personal Access Token with X-Figma-Token header
+      this.headers = { "X-Figma-Token": this.apiKey };
+    }
   }
 
   private async request<T>(endpoint: string): Promise<T> {
     try {
-      Logger.log(`Calling ${this.baseUrl}${endpoint}`);
-
-      // Set auth headers based on authentication method
-      const headers: Record<string, string> = {};
-
-      if (this.useOAuth) {
-        // Use OAuth token with Authorization: Bearer header
-        Logger.log("Using OAuth Bearer token for authentication");
-        headers["Authorization"] = `Bearer ${this.oauthToken}`;
-      } else {
-        // Use Personal Access Token with X-Figma-Token header
-        Logger.log("Using Personal Access Token for authentication");
-        headers["X-Figma-Token"] = this.apiKey;
-      }
+      Logger.log(
+        `Calling ${this.baseUrl}${endpoint} (auth: ${this.useOAuth ? "OAuth Bearer token" : "Personal Access Token"})`,
+      );
 
       return await fetchWithRetry<T>(`${this.baseUrl}${endpoint}`, {
-        headers,
+        headers: this.headers,
       });
     } catch (error) {
       if (error instanceof Error) {
@@ -79,6 +102,120 @@ export class FigmaService {
     }
   }
 
+  /**
+   * Request file or node data, reusing a recent response for the same endpoint if there is one
+   * @param endpoint - The endpoint to request
+   * @param fullEndpoint - The same request without a depth limit. A cached response for it is a
+   * superset of the requested data and is used instead, since depth is also enforced client-side.
+   * @param refresh - Skip any cached response and fetch fresh data
+   */
+  private cachedRequest<T>(endpoint: string, fullEndpoint?: string, refresh = false): Promise<T> {
+    if (!refresh) {
+      const cached =
+        this.responseCache.get(endpoint) ??
+        (fullEndpoint ? this.responseCache.get(fullEndpoint) : undefined);
+      if (cached) {
+        Logger.log(`Using cached response for ${endpoint}`);
+        return cached.response as Promise<T>;
+      }
+    }
+
+    this.evictCachedResponse(endpoint);
+    // A refresh also replaces any stale unlimited-depth copy of the same data
+    if (refresh && fullEndpoint) this.evictCachedResponse(fullEndpoint);
+    if (this.responseCache.size >= RESPONSE_CACHE_MAX_ENTRIES) {
+      // Maps iterate in insertion order, so the first key is the oldest entry
+      const oldest = this.responseCache.keys().next().value;
+      if (oldest !== undefined) this.evictCachedResponse(oldest);
+    }
+
+    const response = this.request<T>(endpoint);
+    const expiryTimer = setTimeout(() => {
+      if (this.responseCache.get(endpoint)?.response === response) {
+        this.responseCache.delete(endpoint);
+      }
+    }, RESPONSE_CACHE_TTL_MS);
+    // Don't keep the process alive just to expire the cache
+    expiryTimer.unref();
+    this.responseCache.set(endpoint, { response, expiryTimer });
+
+    // Never cache failures
+    response.catch(() => {
+      if (this.responseCache.get(endpoint)?.response === response) {
+        this.evictCachedResponse(endpoint);
+      }
+    });
+    return response;
+  }
+
+  private evictCachedResponse(endpoint: string): void {
+    const entry = this.responseCache.get(endpoint);
+    if (!entry) return;
+    clearTimeout(entry.expiryTimer);
+    this.responseCache.delete(endpoint);
+  }
+
+  /**
+   * Fetch one or more comma-separated nodes. All IDs go in a single request unless the list is
+   * too long for one URL, in which case the batches are requested a few at a time and merged into
+   * a single response.
+   * @param fileKey - The file containing the nodes
+   * @param nodeId - One node ID, or several separated by commas
+   * @param apiDepth - Optional depth limit passed to the API
+   * @param refresh - Skip any cached response and fetch fresh data
+   * @throws Error if nodeId contains no node IDs
+   */
+  private async requestNodes(
+    fileKey: string,
+    nodeId: string,
+    apiDepth?: number,
+    refresh = false,
+  ): Promise<GetFileNodesResponse> {
+    const ids = nodeId
+      .split(",")
+      .map((id) => id.trim())
+      .filter(Boolean);
+    if (ids.length === 0) {
+      throw new Error(`Invalid nodeId "${nodeId}": expected one or more comma-separated node IDs`);
+    }
+
+    const batches: string[] = [];
+    let batch = ids[0];
+    for (let i = 1; i < ids.length; i++) {
+      if (batch.length + ids[i].length + 1 > MAX_NODE_IDS_LENGTH) {
+        batches.push(batch);
+        batch = ids[i];
+      } else {
+        batch += `,${ids[i]}`;
+      }
+    }
+    batches.push(batch);
+
+    const responses: GetFileNodesResponse[] = new Array(batches.length);
+    let nextBatch = 0;
+    const requestBatches = async () => {
+      while (nextBatch < batches.length) {
+        const index = nextBatch++;
+        const fullEndpoint = `/files/${fileKey}/nodes?ids=${batches[index]}`;
+        const endpoint = `${fullEndpoint}${apiDepth ? `&depth=${apiDepth}` : ""}`;
+        responses[index] = await this.cachedRequest<GetFileNodesResponse>(
+          endpoint,
+          fullEndpoint,
+          refresh,
+        );
+      }
+    };
+    await Promise.all(
+      Array.from({ length: Math.min(NODE_REQUEST_CONCURRENCY, batches.length) }, requestBatches),
+    );
+
+    if (responses.length === 1) return responses[0];
+    return {
+      ...responses[0],
+      nodes: Object.assign({}, ...responses.map(({ nodes }) => nodes)),
+    };
+  }
+
   async getImageFills(
     fileKey: string,
     nodes: FetchImageFillParams[],
@@ -135,22 +272,28 @@ export class FigmaService {
           )
         : ({} as GetImagesResponse["images"]);
 
-    const files = await Promise.all([pngFiles, svgFiles]).then(([f, l]) => ({ ...f, ...l }));
-
-    const downloads = nodes
-      .map(({ nodeId, fileName }) => {
+    // Start downloading each format as soon as its render URLs arrive, instead of waiting for
+    // both the PNG and SVG render requests to finish
+    const filesByType = { png: pngFiles, svg: svgFiles };
+    const downloads = nodes.map(({ nodeId, fileName, fileType }) =>
+      Promise.resolve(filesByType[fileType]).then((files) => {
         const imageUrl = files[nodeId];
         if (imageUrl) {
           return downloadFigmaImage(fileName, localPath, imageUrl);
         }
         return false;
-      })
-      .filter((url) => !!url);
+      }),
+    );
 
-    return Promise.all(downloads);
+    const results = await Promise.all(downloads);
+    return results.filter((path): path is string => !!path);
   }
 
-  async getFile(fileKey: string, depth?: number | null): Promise<SimplifiedDesign> {
+  async getFile(
+    fileKey: string,
+    depth?: number | null,
+    refresh = false,
+  ): Promise<SimplifiedDesign> {
     try {
       // Apply API depth optimization - give some buffer space for accurate client-side control
       let apiDepth: number | undefined;
@@ -160,9 +303,10 @@ export class FigmaService {
         apiDepth = Math.min(depth + 2, 10);
       }
       
-      const endpoint = `/files/${fileKey}${apiDepth ? `?depth=${apiDepth}` : ""}`;
+      const fullEndpoint = `/files/${fileKey}`;
+      const endpoint = `${fullEndpoint}${apiDepth ? `?depth=${apiDepth}` : ""}`;
       Logger.log(`Retrieving Figma file: ${fileKey} (API depth: ${apiDepth ?? "default"}, client depth: ${depth ?? "unlimited"})`);
-      const response = await this.request<GetFileResponse>(endpoint);
+      const response = await this.cachedRequest<GetFileResponse>(endpoint, fullEndpoint, refresh);
       Logger.log("Got response");
       const simplifiedResponse = parseFigmaResponse(response, depth || undefined);
       writeLogs("figma-raw.yml", response);
@@ -174,7 +318,12 @@ export class FigmaService {
     }
   }
 
-  async getNode(fileKey: string, nodeId: string, depth?: number | null): Promise<SimplifiedDesign> {
+  async getNode(
+    fileKey: string,
+    nodeId: string,
+    depth?: number | null,
+    refresh = false,
+  ): Promise<SimplifiedDesign> {
     // Apply API depth optimization - give some buffer space for accurate client-side control
     let apiDepth: number | undefined;
     if (depth !== null && depth !== undefined) {
@@ -183,9 +332,8 @@ export class FigmaService {
       apiDepth = Math.min(depth + 2, 10);
     }
     
-    const endpoint = `/files/${fileKey}/nodes?ids=${nodeId}${apiDepth ? `&depth=${apiDepth}` : ""}`;
     Logger.log(`Retrieving Figma node: ${nodeId} from ${fileKey} (API depth: ${apiDepth ?? "default"}, client depth: ${depth ?? "unlimited"})`);
-    const response = await this.request<GetFileNodesResponse>(endpoint);
+    const response = await this.requestNodes(fileKey, nodeId, apiDepth, refresh);
     Logger.log("Got response from getNode, now parsing.");
     writeLogs("figma-raw.yml", response);
     const simplifiedResponse = parseFigmaResponse(response, depth || undefined);
@@ -193,13 +341,16 @@ export class FigmaService {
     return simplifiedResponse;
   }
 
-  async getRawData(fileKey: string, nodeId?: string): Promise<GetFileResponse | GetFileNodesResponse> {
+  async getRawData(
+    fileKey: string,
+    nodeId?: string,
+    refresh = false,
+  ): Promise<GetFileResponse | GetFileNodesResponse> {
     if (nodeId) {
-      const endpoint = `/files/${fileKey}/nodes?ids=${nodeId}`;
-      return await this.request<GetFileNodesResponse>(endpoint);
+      return await this.requestNodes(fileKey, nodeId, undefined, refresh);
     } else {
       const endpoint = `/files/${fileKey}`;
-      return await this.request<GetFileResponse>(endpoint);
+      return await this.cachedRequest<GetFileResponse>(endpoint, undefined, refresh);
     }
   }
 }
@@ -220,7 +371,7 @@ function writeLogs(name: string, value: any) {
     if (!fs.existsSync(logsDir)) {
       fs.mkdirSync(logsDir);
     }
-    fs.writeFileSync(`${logsDir}/${name}`, yaml.dump(value));
+    fs.writeFileSync(`${logsDir}/${name}`, toYaml(value));
   } catch (error) {
     console.debug("Failed to write logs:", error);
   }
@@ -14,9 +14,9 @@ import type {
   SimplifiedComponentSetDefinition,
 } from "~/utils/sanitization.js";
 import { sanitizeComponents, sanitizeComponentSets } from "~/utils/sanitization.js";
-import { hasValue, isRectangleCornerRadii, isTruthy } from "~/utils/identity.js";
+import { hasValue, isAutoLayoutFrame, isRectangleCornerRadii, isTruthy } from "~/utils/identity.js";
 import {
-  removeEmptyKeys,
+  canonicalKey,
   generateVarId,
   type StyleId,
   parsePaint,
@@ -59,17 +59,27 @@ type StyleTypes =
   | SimplifiedStroke
   | SimplifiedEffects
   | string;
+interface StyleEntry {
+  id: StyleId;
+  value: StyleTypes;
+  usageCount: number;
+}
 interface TableCounter {
   row_count: number;
   rows_seen: Map<string, number>;
 }
 
+// Parsing state shared by every node; only the styles end up in the output
 type GlobalVars = {
-  styles: Record<StyleId, StyleTypes>;
-  lookup: Map<string, StyleId>;  // Fast lookup for existing styles
-  usageCount: Record<StyleId, number>;  // Track usage count for optimization
+  styleEntries: Map<string, StyleEntry>;  // Style ID, value and usage count by canonical value
   nodeSeenCount: Map<string, number>;  // Track duplicate nodes
   tableCounters: Map<string, TableCounter>;  // Track table-specific counters
+  signatureCache: Map<string, string>;  // Structure signatures by node ID
+};
+
+export type SimplifiedGlobalVars = {
+  styles?: Record<StyleId, StyleTypes>;
+  usageCount?: Record<StyleId, number>;
 };
 
 export interface SimplifiedDesign {
@@ -77,9 +87,9 @@ export interface SimplifiedDesign {
   lastModified: string;
   thumbnailUrl: string;
   nodes: SimplifiedNode[];
-  components: Record<string, SimplifiedComponentDefinition>;
-  componentSets: Record<string, SimplifiedComponentSetDefinition>;
-  globalVars: GlobalVars;
+  components?: Record<string, SimplifiedComponentDefinition>;
+  componentSets?: Record<string, SimplifiedComponentSetDefinition>;
+  globalVars?: SimplifiedGlobalVars;
 }
 
 export interface ComponentProperties {
@@ -145,56 +155,81 @@ export interface ColorValue {
   opacity: number;
 }
 
+// Styles used fewer times than this are inlined into the nodes that reference them
+const USAGE_THRESHOLD = 3;
+
+// Node properties that may hold a style variable ID
+const STYLE_PROPERTIES: (keyof SimplifiedNode)[] = ['textStyle', 'fills', 'strokes', 'effects', 'layout'];
+
 /**
- * Optimize styles by inlining low-usage styles
+ * Replace inlined style IDs with their values in the nodes and their descendants, in place
  * @param nodes - Simplified nodes
- * @param globalVars - Global variables containing styles and usage counts
- * @returns Optimized nodes with inlined styles
+ * @param inlineValues - Style values to inline, by style ID
  */
-function optimizeStyles(nodes: SimplifiedNode[], globalVars: GlobalVars): SimplifiedNode[] {
-  const USAGE_THRESHOLD = 3;
-  
-  // Determine which styles to inline based on usage count
-  const stylesToInline = new Set<StyleId>();
-  Object.entries(globalVars.usageCount).forEach(([styleId, count]) => {
-    if (count < USAGE_THRESHOLD) {
-      stylesToInline.add(styleId as StyleId);
-    }
-  });
-  
-  // Recursively inline styles in nodes
-  function inlineStylesInNode(node: SimplifiedNode): SimplifiedNode {
-    const updatedNode = { ...node };
+function inlineStyles(nodes: SimplifiedNode[], inlineValues: Map<StyleId, StyleTypes>): void {
+  if (inlineValues.size === 0) return;
+
+  const stack = [...nodes];
+  while (stack.length > 0) {
+    const node = stack.pop()!;
     
     // Check and inline each style property
-    const styleProperties: (keyof SimplifiedNode)[] = ['textStyle', 'fills', 'strokes', 'effects', 'layout'];
-    
-    styleProperties.forEach(prop => {
-      const styleId = updatedNode[prop] as string | undefined;
-      if (styleId && stylesToInline.has(styleId as StyleId)) {
+    for (const prop of STYLE_PROPERTIES) {
+      const styleValue = inlineValues.get(node[prop] as StyleId);
+      if (styleValue !== undefined) {
         // Inline the style value directly
-        const styleValue = globalVars.styles[styleId as StyleId];
-        (updatedNode as any)[prop] = styleValue;
+        (node as any)[prop] = styleValue;
       }
-    });
-    
-    // Process children recursively
-    if (updatedNode.children) {
-      updatedNode.children = updatedNode.children.map(child => inlineStylesInNode(child));
     }
     
-    return updatedNode;
+    if (node.children) {
+      for (const child of node.children) stack.push(child);
+    }
+  }
+}
+
+/**
+ * Optimize styles by inlining low-usage styles
+ * @param nodes - Simplified nodes, updated in place
+ * @param globalVars - Global variables containing the style entries
+ * @returns The shared styles and usage counts for the output
+ */
+function optimizeStyles(nodes: SimplifiedNode[], globalVars: GlobalVars): SimplifiedGlobalVars {
+  const output: SimplifiedGlobalVars = {};
+  if (globalVars.styleEntries.size === 0) return output;
+
+  // Emit usage counts, and keep only styles used often enough to be worth sharing
+  const styles: Record<StyleId, StyleTypes> = {};
+  const usageCount: Record<StyleId, number> = {};
+  const inlineValues = new Map<StyleId, StyleTypes>();
+  for (const { id, value, usageCount: count } of globalVars.styleEntries.values()) {
+    usageCount[id] = count;
+    if (count < USAGE_THRESHOLD) {
+      inlineValues.set(id, value);
+    } else {
+      styles[id] = value;
+    }
   }
   
-  // Clean up unused styles from globalVars
-  stylesToInline.forEach(styleId => {
-    delete globalVars.styles[styleId];
-  });
-  
-  return nodes.map(node => inlineStylesInNode(node));
+  inlineStyles(nodes, inlineValues);
+
+  if (inlineValues.size < globalVars.styleEntries.size) {
+    output.styles = styles;
+  }
+  output.usageCount = usageCount;
+  return output;
 }
 
 // ---------------------- PARSING ----------------------
+/**
+ * Simplify a Figma file or nodes response.
+ *
+ * Nodes are built without empty values, so the result needs no separate pruning pass. Keys whose
+ * value is undefined are dropped by the serializers.
+ * @param data - The raw Figma response
+ * @param maxDepth - Optional maximum depth to parse
+ * @returns The simplified design
+ */
 export function parseFigmaResponse(data: GetFileResponse | GetFileNodesResponse, maxDepth?: number): SimplifiedDesign {
   const aggregatedComponents: Record<string, Component> = {};
   const aggregatedComponentSets: Record<string, ComponentSet> = {};
@@ -219,38 +254,41 @@ export function parseFigmaResponse(data: GetFileResponse | GetFileNodesResponse,
     nodesToParse = data.document.children;
   }
 
-  const sanitizedComponents = sanitizeComponents(aggregatedComponents);
-  const sanitizedComponentSets = sanitizeComponentSets(aggregatedComponentSets);
-
   const { name, lastModified, thumbnailUrl } = data;
 
-  let globalVars: GlobalVars = {
-    styles: {},
-    lookup: new Map(),
-    usageCount: {},
+  const globalVars: GlobalVars = {
+    styleEntries: new Map(),
     nodeSeenCount: new Map(),
     tableCounters: new Map(),
+    signatureCache: new Map(),
   };
 
-  let simplifiedNodes: SimplifiedNode[] = nodesToParse
-    .filter(isVisible)
-    .map((n) => parseNode(globalVars, n, undefined, 0, undefined, maxDepth))
-    .filter((child) => child !== null && child !== undefined);
+  const simplifiedNodes: SimplifiedNode[] = parseNodeTree(
+    globalVars,
+    nodesToParse.filter(isVisible),
+    maxDepth,
+  );
 
   // Optimize styles by inlining low-usage ones
-  simplifiedNodes = optimizeStyles(simplifiedNodes, globalVars);
+  const simplifiedGlobalVars = optimizeStyles(simplifiedNodes, globalVars);
 
   const simplifiedDesign: SimplifiedDesign = {
     name,
     lastModified,
     thumbnailUrl: thumbnailUrl || "",
     nodes: simplifiedNodes,
-    components: sanitizedComponents,
-    componentSets: sanitizedComponentSets,
-    globalVars,
   };
+  if (Object.keys(aggregatedComponents).length > 0) {
+    simplifiedDesign.components = sanitizeComponents(aggregatedComponents);
+  }
+  if (Object.keys(aggregatedComponentSets).length > 0) {
+    simplifiedDesign.componentSets = sanitizeComponentSets(aggregatedComponentSets);
+  }
+  if (simplifiedGlobalVars.usageCount) {
+    simplifiedDesign.globalVars = simplifiedGlobalVars;
+  }
 
-  return removeEmptyKeys(simplifiedDesign);
+  return simplifiedDesign;
 }
 
 // Helper function to find node by ID
@@ -280,63 +318,83 @@ const findNodeById = (id: string, nodes: SimplifiedNode[]): SimplifiedNode | und
  */
 function findOrCreateVar(globalVars: GlobalVars, value: any, prefix: string): StyleId {
   // Create stable string representation for lookup
-  const valueStr = JSON.stringify(value, Object.keys(value).sort());
+  const valueStr = canonicalKey(value);
   
-  // Check if the same value already exists using fast lookup
-  const existingVarId = globalVars.lookup.get(valueStr);
+  // Check if the same value already exists using a single lookup
+  const existing = globalVars.styleEntries.get(valueStr);
   
-  if (existingVarId) {
+  if (existing) {
     // Increment usage count
-    globalVars.usageCount[existingVarId] = (globalVars.usageCount[existingVarId] || 0) + 1;
-    return existingVarId;
+    existing.usageCount++;
+    return existing.id;
   }
 
   // Create a new variable if it doesn't exist
   const varId = generateVarId(prefix);
-  globalVars.styles[varId] = value;
-  globalVars.lookup.set(valueStr, varId);
-  globalVars.usageCount[varId] = 1;
+  globalVars.styleEntries.set(valueStr, { id: varId, value, usageCount: 1 });
   return varId;
 }
 
+/**
+ * Append the structure of a node and its first few descendants to `structureParts`
+ * @param n - The node to analyze
+ * @param level - Level of the node below the signature root
+ * @param structureParts - Collected signature parts
+ */
+function collectStructure(n: FigmaDocumentNode, level: number, structureParts: string[]): void {
+  if (level > 2) return; // Only check first few levels
+  
+  // Record node type
+  structureParts.push(`${level}:${n.type || 'UNKNOWN'}`);
+  
+  // Record children count and types
+  if (hasValue('children', n) && n.children.length > 0) {
+    const childTypes = n.children.map(c => c.type || 'UNKNOWN');
+    structureParts.push(`${level}:children=${n.children.length}`);
+    structureParts.push(`${level}:types=${Array.from(new Set(childTypes)).sort().join(',')}`);
+    
+    // Recursively process first few children
+    n.children.slice(0, 3).forEach(child => collectStructure(child, level + 1, structureParts));
+  }
+}
+
 /**
  * Get structural signature of a node for pattern detection
  * @param node - The node to analyze
+ * @param signatureCache - Previously computed signatures by node ID
  * @returns A structural signature string
  */
-function getNodeStructureSignature(node: FigmaDocumentNode): string {
+function getNodeStructureSignature(
+  node: FigmaDocumentNode,
+  signatureCache: Map<string, string>,
+): string {
+  const cached = signatureCache.get(node.id);
+  if (cached !== undefined) return cached;
+
   const structureParts: string[] = [];
-  
-  function collectStructure(n: FigmaDocumentNode, level: number = 0) {
-    if (level > 2) return; // Only check first few levels
-    
-    // Record node type
-    structureParts.push(`${level}:${n.type || 'UNKNOWN'}`);
-    
-    // Record children count and types
-    if (hasValue('children', n) && n.children.length > 0) {
-      const childTypes = n.children.map(c => c.type || 'UNKNOWN');
-      structureParts.push(`${level}:children=${n.children.length}`);
-      structureParts.push(`${level}:types=${Array.from(new Set(childTypes)).sort().join(',')}`);
-      
-      // Recursively process first few children
-      n.children.slice(0, 3).forEach(child => collectStructure(child, level + 1));
-    }
-  }
-  
-  collectStructure(node);
-  return structureParts.join('|');
+  collectStructure(node, 0, structureParts);
+  const signature = structureParts.join('|');
+  signatureCache.set(node.id, signature);
+  return signature;
 }
 
 /**
  * Get content signature of a node for duplicate detection
  * @param node - The node to get signature from
+ * @param signatureCache - Previously computed structure signatures by node ID
  * @returns A content-based signature string
  */
-function getContentSignature(node: FigmaDocumentNode): string {
+function getContentSignature(
+  node: FigmaDocumentNode,
+  signatureCache: Map<string, string>,
+): string {
   const contentParts: string[] = [];
   
-  function extractContent(n: FigmaDocumentNode) {
+  // Walk the first few children of each level in document order
+  const stack: FigmaDocumentNode[] = [node];
+  while (stack.length > 0) {
+    const n = stack.pop()!;
+    
     // Text content
     if (n.type === 'TEXT' && hasValue('characters', n)) {
       const text = n.characters.trim();
@@ -353,24 +411,71 @@ function getContentSignature(node: FigmaDocumentNode): string {
     
     // Process first few children
     if (hasValue('children', n)) {
-      n.children.slice(0, 5).forEach(child => extractContent(child));
+      for (let i = Math.min(n.children.length, 5) - 1; i >= 0; i--) {
+        stack.push(n.children[i]);
+      }
     }
   }
   
-  extractContent(node);
-  
   // Generate signature
-  return contentParts.length > 0 ? contentParts.join('|') : getNodeStructureSignature(node);
+  return contentParts.length > 0
+    ? contentParts.join('|')
+    : getNodeStructureSignature(node, signatureCache);
 }
 
+/**
+ * A pending node in the parse work stack. The simplified result is written to `target[index]`,
+ * which is the slot reserved for it in its parent's `children` array.
+ */
+interface ParseTask {
+  node: FigmaDocumentNode;
+  parent?: FigmaDocumentNode;
+  depth: number;
+  parentContext?: string;
+  target: SimplifiedNode[];
+  index: number;
+}
+
+/**
+ * Parse a list of root nodes and their subtrees.
+ *
+ * Walks the tree with an explicit work stack instead of recursion, so very deep designs cannot
+ * overflow the call stack. Children are pushed in reverse so nodes are still visited in document
+ * order, which the table row counters depend on.
+ * @param globalVars - Global variables object
+ * @param roots - Root nodes to parse
+ * @param maxDepth - Optional maximum depth to parse
+ * @returns The simplified root nodes
+ */
+function parseNodeTree(
+  globalVars: GlobalVars,
+  roots: FigmaDocumentNode[],
+  maxDepth?: number,
+): SimplifiedNode[] {
+  const result: SimplifiedNode[] = new Array(roots.length);
+  const stack: ParseTask[] = [];
+  for (let i = roots.length - 1; i >= 0; i--) {
+    stack.push({ node: roots[i], depth: 0, target: result, index: i });
+  }
+
+  while (stack.length > 0) {
+    const task = stack.pop()!;
+    task.target[task.index] = parseNode(globalVars, task, stack, maxDepth);
+  }
+
+  return result;
+}
+
+/**
+ * Simplify a single node. Visible children are not parsed here; a slot is reserved for each of
+ * them in `children` and a task is pushed onto `stack` to fill it.
+ */
 function parseNode(
   globalVars: GlobalVars,
-  n: FigmaDocumentNode,
-  parent?: FigmaDocumentNode,
-  depth: number = 0,
-  parentContext?: string,
+  { node: n, parent, depth, parentContext }: ParseTask,
+  stack: ParseTask[],
   maxDepth?: number,
-): SimplifiedNode | null {
+): SimplifiedNode {
   // Check if exceeds maximum depth limit
   if (maxDepth !== undefined && depth > maxDepth) {
     return {
@@ -382,6 +487,10 @@ function parseNode(
   }
 
   const { id, name, type } = n;
+  // Read once; checked by table detection and child queueing below
+  const nodeChildren: FigmaDocumentNode[] | undefined = hasValue("children", n)
+    ? n.children
+    : undefined;
 
   const simplified: SimplifiedNode = {
     id,
@@ -396,13 +505,16 @@ function parseNode(
 
     // Add specific properties for instances of components
     if (hasValue("componentProperties", n)) {
-      simplified.componentProperties = Object.entries(n.componentProperties ?? {}).map(
+      const componentProperties = Object.entries(n.componentProperties ?? {}).map(
         ([name, { value, type }]) => ({
           name,
           value: value.toString(),
           type,
         }),
       );
+      if (componentProperties.length) {
+        simplified.componentProperties = componentProperties;
+      }
     }
   }
 
@@ -425,7 +537,9 @@ function parseNode(
       textAlignHorizontal: style.textAlignHorizontal,
       textAlignVertical: style.textAlignVertical,
     };
-    simplified.textStyle = findOrCreateVar(globalVars, textStyle, "style");
+    if (Object.values(textStyle).some((value) => value !== undefined)) {
+      simplified.textStyle = findOrCreateVar(globalVars, textStyle, "style");
+    }
   }
 
   // fills & strokes
@@ -445,35 +559,39 @@ function parseNode(
     simplified.effects = findOrCreateVar(globalVars, effects, "effect");
   }
 
-  // Process layout with intelligent filtering
-  const layout = buildSimplifiedLayout(n, parent);
-  if (Object.keys(layout).length > 1) {
-    // Filter to only important visual properties
-    const importantLayout: Partial<SimplifiedLayout> = {};
-    
-    // Keep only visual-related properties
-    if (layout.mode && layout.mode !== 'none') {
-      importantLayout.mode = layout.mode;
-    }
-    if (layout.justifyContent) {
-      importantLayout.justifyContent = layout.justifyContent;
-    }
-    if (layout.alignItems) {
-      importantLayout.alignItems = layout.alignItems;
-    }
-    if (layout.gap) {
-      importantLayout.gap = layout.gap;
-    }
-    if (layout.padding) {
-      importantLayout.padding = layout.padding;
-    }
-    if (layout.wrap) {
-      importantLayout.wrap = layout.wrap;
-    }
-    
-    // Only store if there are meaningful properties
-    if (Object.keys(importantLayout).length > 0 && importantLayout.mode !== 'none') {
-      simplified.layout = findOrCreateVar(globalVars, importantLayout, "layout");
+  // Process layout with intelligent filtering.
+  // Only auto layout frames have any of the visual properties kept below, so other nodes skip
+  // building the layout entirely.
+  if (isAutoLayoutFrame(n)) {
+    const layout = buildSimplifiedLayout(n, parent);
+    if (Object.keys(layout).length > 1) {
+      // Filter to only important visual properties
+      const importantLayout: Partial<SimplifiedLayout> = {};
+
+      // Keep only visual-related properties
+      if (layout.mode && layout.mode !== 'none') {
+        importantLayout.mode = layout.mode;
+      }
+      if (layout.justifyContent) {
+        importantLayout.justifyContent = layout.justifyContent;
+      }
+      if (layout.alignItems) {
+        importantLayout.alignItems = layout.alignItems;
+      }
+      if (layout.gap) {
+        importantLayout.gap = layout.gap;
+      }
+      if (layout.padding) {
+        importantLayout.padding = layout.padding;
+      }
+      if (layout.wrap) {
+        importantLayout.wrap = layout.wrap;
+      }
+
+      // Only store if there are meaningful properties
+      if (Object.keys(importantLayout).length > 0 && importantLayout.mode !== 'none') {
+        simplified.layout = findOrCreateVar(globalVars, importantLayout, "layout");
+      }
     }
   }
 
@@ -500,22 +618,25 @@ function parseNode(
   let containerType = parentContext;
   
   // Generic table detection: check if there are repeating child structures
-  if (hasValue('children', n) && n.children.length > 3) {
+  if (nodeChildren && nodeChildren.length > 3) {
     // Check if children have similar structures (possibly table rows)
     const childSignatures = new Map<string, number>();
+    let maxCount = 0;
     
     // Analyze first 10 children
-    n.children.slice(0, 10).forEach(child => {
-      const sig = getNodeStructureSignature(child);
-      childSignatures.set(sig, (childSignatures.get(sig) || 0) + 1);
-    });
+    const sampleSize = Math.min(nodeChildren.length, 10);
+    for (let i = 0; i < sampleSize; i++) {
+      const sig = getNodeStructureSignature(nodeChildren[i], globalVars.signatureCache);
+      const count = (childSignatures.get(sig) || 0) + 1;
+      childSignatures.set(sig, count);
+      maxCount = Math.max(maxCount, count);
+    }
     
     // If there are repeating structures, likely a table
-    const maxCount = Math.max(...Array.from(childSignatures.values()));
     if (maxCount >= 3) {
       containerType = 'table_container';
       // Create independent counter for this table container
-      const tableId = n.id;
+      const tableId = id;
       if (!globalVars.tableCounters.has(tableId)) {
         globalVars.tableCounters.set(tableId, {
           row_count: 0,
@@ -525,39 +646,43 @@ function parseNode(
     }
   }
 
-  // Recursively process child nodes.
+  // Queue child nodes for processing.
   // Include children at the very end so all relevant configuration data for the element is output first and kept together for the AI.
-  if (hasValue("children", n) && n.children.length > 0) {
+  if (nodeChildren && nodeChildren.length > 0) {
     const children: SimplifiedNode[] = [];
+    const childDepth = depth + 1;
+    // Tasks are pushed in document order, then this range of the stack is reversed
+    const firstTask = stack.length;
     
     // Get current table counter if in table container
     let currentTableCounter: TableCounter | undefined;
     if (containerType === 'table_container') {
-      const tableId = n.id;
-      currentTableCounter = globalVars.tableCounters.get(tableId);
+      currentTableCounter = globalVars.tableCounters.get(id);
     }
     
-    for (const child of n.children) {
+    for (const child of nodeChildren) {
       if (!isVisible(child)) continue;
       
-      const childName = child.name || '';
-      
       // Generic intermediate layer skipping logic
       if (child.type === 'INSTANCE') {
         // If INSTANCE has only one child, it might be unnecessary wrapper
         if (hasValue('children', child) && child.children.length === 1) {
           // Use the child directly
-          const simplified = parseNode(globalVars, child.children[0], n, depth + 1, containerType, maxDepth);
-          if (simplified) {
-            children.push(simplified);
-          }
+          stack.push({
+            node: child.children[0],
+            parent: n,
+            depth: childDepth,
+            parentContext: containerType,
+            target: children,
+            index: stack.length - firstTask,
+          });
           continue;
         }
       }
       
       // In table containers, identify duplicate rows
       if (containerType === 'table_container' && currentTableCounter) {
-        const signature = getContentSignature(child);
+        const signature = getContentSignature(child, globalVars.signatureCache);
         const rowsSeen = currentTableCounter.rows_seen;
         
         const seenCount = rowsSeen.get(signature) || 0;
@@ -573,12 +698,19 @@ function parseNode(
         }
       }
       
-      const simplifiedChild = parseNode(globalVars, child, n, depth + 1, containerType, maxDepth);
-      if (simplifiedChild) {
-        children.push(simplifiedChild);
-      }
+      stack.push({
+        node: child,
+        parent: n,
+        depth: childDepth,
+        parentContext: containerType,
+        target: children,
+        index: stack.length - firstTask,
+      });
     }
     
+    // Reserve a slot for each queued child ahead of the summary
+    children.length = stack.length - firstTask;
+    
     // Add summary for omitted table rows
     if (currentTableCounter && currentTableCounter.rows_seen.size > 0) {
       const totalRows = Array.from(currentTableCounter.rows_seen.values()).reduce((sum, count) => sum + count, 0);
@@ -595,6 +727,13 @@ function parseNode(
     if (children.length) {
       simplified.children = children;
     }
+    
+    // Reverse the queued tasks so the first child is parsed next
+    for (let i = firstTask, j = stack.length - 1; i < j; i++, j--) {
+      const task = stack[i];
+      stack[i] = stack[j];
+      stack[j] = task;
+    }
   }
 
   // Convert VECTOR to IMAGE
@@ -0,0 +1,123 @@
+import type { Paint } from "@figma/rest-api-spec";
+import {
+  canonicalKey,
+  convertColor,
+  formatRGBAColor,
+  parseFigmaUrl,
+  parsePaint,
+} from "~/utils/common.js";
+
+describe("canonicalKey", () => {
+  it("distinguishes values that differ only in nested keys", () => {
+    const a = [{ type: "IMAGE", imageRef: "ref-a", scaleMode: "FILL" }];
+    const b = [{ type: "IMAGE", imageRef: "ref-b", scaleMode: "FILL" }];
+
+    expect(canonicalKey(a)).not.toBe(canonicalKey(b));
+  });
+
+  it("distinguishes nested objects whose keys differ from the top level", () => {
+    const a = { mode: "row", padding: { top: 1 } };
+    const b = { mode: "row", padding: { top: 2 } };
+
+    expect(canonicalKey(a)).not.toBe(canonicalKey(b));
+  });
+
+  it("ignores property order at every level", () => {
+    const a = { b: 1, a: { y: [1, 2], x: "x" } };
+    const b = { a: { x: "x", y: [1, 2] }, b: 1 };
+
+    expect(canonicalKey(a)).toBe(canonicalKey(b));
+  });
+
+  it("skips undefined values like JSON.stringify", () => {
+    expect(canonicalKey({ a: 1, b: undefined })).toBe(canonicalKey({ a: 1 }));
+    expect(canonicalKey([undefined])).toBe("[null]");
+  });
+});
+
+describe("color conversion", () => {
+  const solid = (color: { r: number; g: number; b: number; a: number }, opacity?: number) =>
+    ({ type: "SOLID", blendMode: "NORMAL", color, opacity }) as Paint;
+
+  it("applies the color alpha of a translucent solid paint once", () => {
+    expect(parsePaint(solid({ r: 1, g: 0, b: 0, a: 0.5 }))).toBe("rgba(255, 0, 0, 0.5)");
+  });
+
+  it("multiplies the paint opacity with the color alpha", () => {
+    expect(parsePaint(solid({ r: 1, g: 0, b: 0, a: 0.5 }, 0.5))).toBe("rgba(255, 0, 0, 0.25)");
+  });
+
+  it("returns hex for opaque solid paints", () => {
+    expect(parsePaint(solid({ r: 1, g: 0.5, b: 0, a: 1 }))).toBe("#FF8000");
+  });
+
+  it("keeps alpha in rgba and { hex, opacity } conversions", () => {
+    const color = { r: 0, g: 0, b: 1, a: 0.4 };
+
+    expect(formatRGBAColor(color)).toBe("rgba(0, 0, 255, 0.4)");
+    expect(formatRGBAColor(color, 0.5)).toBe("rgba(0, 0, 255, 0.2)");
+    expect(convertColor(color)).toEqual({ hex: "#0000FF", opacity: 0.4 });
+  });
+});
+
+describe("parseFigmaUrl", () => {
+  it("reads the file key and converts the node-id to API form", () => {
+    expect(parseFigmaUrl("https://www.figma.com/design/abc123/My-File?node-id=12-34")).toEqual({
+      fileKey: "abc123",
+      nodeId: "12:34",
+    });
+  });
+
+  it("finds node-id after other query parameters", () => {
+    expect(
+      parseFigmaUrl("https://www.figma.com/file/abc123/My-File?t=xyz&node-id=12-34&m=dev"),
+    ).toEqual({ fileKey: "abc123", nodeId: "12:34" });
+  });
+
+  it("decodes percent-encoded node IDs", () => {
+    expect(parseFigmaUrl("https://www.figma.com/design/abc123/My-File?node-id=12%3A34")).toEqual({
+      fileKey: "abc123",
+      nodeId: "12:34",
+    });
+  });
+
+  it("converts every part of instance node IDs", () => {
+    expect(
+      parseFigmaUrl("https://www.figma.com/design/abc123/My-File?node-id=I1-2;3-4")?.nodeId,
+    ).toBe("I1:2;3:4");
+    expect(
+      parseFigmaUrl("https://www.figma.com/design/abc123/My-File?node-id=I1-2%3B3-4")?.nodeId,
+    ).toBe("I1:2;3:4");
+  });
+
+  it("parses prototype URLs", () => {
+    expect(
+      parseFigmaUrl(
+        "https://www.figma.com/proto/abc123/My-File?starting-point-node-id=1-1&node-id=5-6",
+      ),
+    ).toEqual({ fileKey: "abc123", nodeId: "5:6" });
+  });
+
+  it("uses the branch key for branch URLs", () => {
+    expect(
+      parseFigmaUrl("https://www.figma.com/design/abc123/branch/def456/My-File?node-id=1-2"),
+    ).toEqual({ fileKey: "def456", nodeId: "1:2" });
+  });
+
+  it("leaves the node ID unset when the URL has none", () => {
+    expect(parseFigmaUrl("https://www.figma.com/design/abc123/My-File")).toEqual({
+      fileKey: "abc123",
+      nodeId: undefined,
+    });
+  });
+
+  it("returns undefined for a bare file key", () => {
+    expect(parseFigmaUrl("abc123")).toBeUndefined();
+  });
+
+  it("throws on malformed percent-encoding", () => {
+    expect(() =>
+      parseFigmaUrl("https://www.figma.com/design/abc123/My-File?node-id=%E0%A4%A"),
+    ).toThrow(URIError);
+  });
+});
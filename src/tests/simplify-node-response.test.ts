@@ -0,0 +1,50 @@
+import type { GetFileNodesResponse } from "@figma/rest-api-spec";
+import { parseFigmaResponse } from "~/services/simplify-node-response.js";
+
+const solidFill = (r: number, g: number, b: number) => [
+  { type: "SOLID", blendMode: "NORMAL", color: { r, g, b, a: 1 } },
+];
+
+const nodesResponse = (document: { id: string }) =>
+  ({
+    name: "Test file",
+    lastModified: "2025-01-01T00:00:00Z",
+    thumbnailUrl: "",
+    nodes: { [document.id]: { document, components: {}, componentSets: {} } },
+  }) as unknown as GetFileNodesResponse;
+
+describe("parseFigmaResponse style optimization", () => {
+  it("inlines low-usage styles with their values", () => {
+    const design = parseFigmaResponse(
+      nodesResponse({
+        id: "1:1",
+        name: "Card",
+        type: "FRAME",
+        fills: solidFill(1, 0, 0),
+        children: [
+          { id: "1:2", name: "Dot", type: "RECTANGLE", fills: solidFill(0, 0, 1) },
+          { id: "1:3", name: "Dot", type: "RECTANGLE", fills: solidFill(0, 0, 1) },
+          { id: "1:4", name: "Dot", type: "RECTANGLE", fills: solidFill(0, 0, 1) },
+        ],
+      }),
+    );
+
+    const [card] = design.nodes;
+    expect(card.fills).toEqual(["#FF0000"]);
+
+    // The shared fill is used often enough to stay a global style
+    const sharedFill = card.children![0].fills as string;
+    expect(card.children!.map((child) => child.fills)).toEqual([sharedFill, sharedFill, sharedFill]);
+    expect(design.globalVars?.styles).toEqual({ [sharedFill]: ["#0000FF"] });
+    expect(Object.values(design.globalVars?.usageCount ?? {}).sort()).toEqual([1, 3]);
+  });
+
+  it("omits the shared styles when every style is inlined", () => {
+    const design = parseFigmaResponse(
+      nodesResponse({ id: "2:1", name: "Box", type: "RECTANGLE", fills: solidFill(0, 1, 0) }),
+    );
+
+    expect(design.nodes[0].fills).toEqual(["#00FF00"]);
+    expect(design.globalVars?.styles).toBeUndefined();
+  });
+});
@@ -15,6 +15,28 @@ export interface ColorValue {
   opacity: number;
 }
 
+// Uppercase two-digit hex for every channel value, so hex colors are built by lookup
+const HEX_BYTES: readonly string[] = Array.from({ length: 256 }, (_, i) =>
+  i.toString(16).padStart(2, "0").toUpperCase(),
+);
+
+// figma.com/(file|design|proto)/<fileKey>[/branch/<branchKey>]/... with an optional node-id query
+// parameter, in one match
+const FIGMA_URL_PATTERN =
+  /figma\.com\/(?:file|design|proto)\/([^/?#]+)(?:\/branch\/([^/?#]+))?[^?#]*(?:\?(?:[^#]*&)?node-id=([^&#]+))?/;
+
+// Designs reuse a small palette, so rgba strings are memoized by their packed channel values.
+// The cache is cleared when full to keep memory bounded.
+const COLOR_CACHE_MAX_ENTRIES = 4096;
+const rgbaColorCache = new Map<number, CSSRGBAColor>();
+
+const GRADIENT_PAINT_TYPES: ReadonlySet<string> = new Set([
+  "GRADIENT_LINEAR",
+  "GRADIENT_RADIAL",
+  "GRADIENT_ANGULAR",
+  "GRADIENT_DIAMOND",
+]);
+
 /**
  * Download Figma image and save it locally
  * @param fileName - The filename to save as
@@ -94,46 +116,39 @@ export async function downloadFigmaImage(
 }
 
 /**
- * Remove keys with empty arrays or empty objects from an object.
- * @param input - The input object or value.
- * @returns The processed object or the original value.
+ * Build a canonical string key for a JSON-like value, used to deduplicate style values.
+ *
+ * Object keys are sorted at every level, so objects with the same content produce the same key
+ * regardless of property order. Keys with undefined values are skipped, matching JSON.stringify.
+ * @param value - The value to build a key for
+ * @returns The canonical key
  */
-export function removeEmptyKeys<T>(input: T): T {
-  // If not an object type or null, return directly
-  if (typeof input !== "object" || input === null) {
-    return input;
-  }
-
-  // Handle array type
-  if (Array.isArray(input)) {
-    return input.map((item) => removeEmptyKeys(item)) as T;
+export function canonicalKey(value: unknown): string {
+  if (Array.isArray(value)) {
+    let key = "[";
+    for (let i = 0; i < value.length; i++) {
+      if (i > 0) key += ",";
+      key += value[i] === undefined ? "null" : canonicalKey(value[i]);
+    }
+    return key + "]";
   }
 
-  // Handle object type
-  const result = {} as T;
-  for (const key in input) {
-    if (Object.prototype.hasOwnProperty.call(input, key)) {
-      const value = input[key];
-
-      // Recursively process nested objects
-      const cleanedValue = removeEmptyKeys(value);
-
-      // Skip empty arrays and empty objects
-      if (
-        cleanedValue !== undefined &&
-        !(Array.isArray(cleanedValue) && cleanedValue.length === 0) &&
-        !(
-          typeof cleanedValue === "object" &&
-          cleanedValue !== null &&
-          Object.keys(cleanedValue).length === 0
-        )
-      ) {
-        result[key] = cleanedValue;
-      }
+  if (typeof value === "object" && value !== null) {
+    const record = value as Record<string, unknown>;
+    const keys = Object.keys(record).sort();
+    let key = "{";
+    let first = true;
+    for (const k of keys) {
+      const v = record[k];
+      if (v === undefined) continue;
+      if (!first) key += ",";
+      key += JSON.stringify(k) + ":" + canonicalKey(v);
+      first = false;
     }
+    return key + "}";
   }
 
-  return result;
+  return JSON.stringify(value) ?? "null";
 }
 
 /**
@@ -163,24 +178,59 @@ export function hexToRgba(hex: string, opacity: number = 1): string {
 }
 
 /**
- * Convert color from RGBA to { hex, opacity }
+ * Figma color channels scaled to 0-255 integers, with alpha already combined with opacity
+ */
+interface RoundedColor {
+  r: number;
+  g: number;
+  b: number;
+  a: number;
+}
+
+/**
+ * Scale a Figma RGBA color to integer channels and a two-decimal alpha.
+ * Shared by every color conversion so the arithmetic is done once per paint.
  *
  * @param color - The color to convert, including alpha channel
  * @param opacity - The opacity of the color, if not included in alpha channel
- * @returns The converted color
+ * @returns The rounded color channels
  **/
-export function convertColor(color: RGBA, opacity = 1): ColorValue {
-  const r = Math.round(color.r * 255);
-  const g = Math.round(color.g * 255);
-  const b = Math.round(color.b * 255);
+function roundColor(color: RGBA, opacity: number): RoundedColor {
+  return {
+    r: Math.round(color.r * 255),
+    g: Math.round(color.g * 255),
+    b: Math.round(color.b * 255),
+    // Alpha channel defaults to 1. If opacity and alpha are both and < 1, their effects are multiplicative
+    a: Math.round(opacity * color.a * 100) / 100,
+  };
+}
 
-  // Alpha channel defaults to 1. If opacity and alpha are both and < 1, their effects are multiplicative
-  const a = Math.round(opacity * color.a * 100) / 100;
+function toHexColor({ r, g, b }: RoundedColor): CSSHexColor {
+  return `#${HEX_BYTES[r]}${HEX_BYTES[g]}${HEX_BYTES[b]}`;
+}
 
-  const hex = ("#" +
-    ((1 << 24) + (r << 16) + (g << 8) + b).toString(16).slice(1).toUpperCase()) as CSSHexColor;
+function toRGBAColor({ r, g, b, a }: RoundedColor): CSSRGBAColor {
+  // Pack the channels and the two-decimal alpha into one integer key
+  const key = Math.round(a * 100) * 0x1000000 + ((r << 16) | (g << 8) | b);
+  let rgba = rgbaColorCache.get(key);
+  if (rgba === undefined) {
+    rgba = `rgba(${r}, ${g}, ${b}, ${a})`;
+    if (rgbaColorCache.size >= COLOR_CACHE_MAX_ENTRIES) rgbaColorCache.clear();
+    rgbaColorCache.set(key, rgba);
+  }
+  return rgba;
+}
 
-  return { hex, opacity: a };
+/**
+ * Convert color from RGBA to { hex, opacity }
+ *
+ * @param color - The color to convert, including alpha channel
+ * @param opacity - The opacity of the color, if not included in alpha channel
+ * @returns The converted color
+ **/
+export function convertColor(color: RGBA, opacity = 1): ColorValue {
+  const rounded = roundColor(color, opacity);
+  return { hex: toHexColor(rounded), opacity: rounded.a };
 }
 
 /**
@@ -191,13 +241,7 @@ export function convertColor(color: RGBA, opacity = 1): ColorValue {
  * @returns The converted color
  **/
 export function formatRGBAColor(color: RGBA, opacity = 1): CSSRGBAColor {
-  const r = Math.round(color.r * 255);
-  const g = Math.round(color.g * 255);
-  const b = Math.round(color.b * 255);
-  // Alpha channel defaults to 1. If opacity and alpha are both and < 1, their effects are multiplicative
-  const a = Math.round(opacity * color.a * 100) / 100;
-
-  return `rgba(${r}, ${g}, ${b}, ${a})`;
+  return toRGBAColor(roundColor(color, opacity));
 }
 
 /**
@@ -283,17 +327,9 @@ export function parsePaint(raw: Paint): SimplifiedFill {
     };
   } else if (raw.type === "SOLID") {
     // treat as SOLID
-    const { hex, opacity } = convertColor(raw.color!, raw.opacity);
-    if (opacity === 1) {
-      return hex;
-    } else {
-      return formatRGBAColor(raw.color!, opacity);
-    }
-  } else if (
-    ["GRADIENT_LINEAR", "GRADIENT_RADIAL", "GRADIENT_ANGULAR", "GRADIENT_DIAMOND"].includes(
-      raw.type,
-    )
-  ) {
+    const rounded = roundColor(raw.color!, raw.opacity ?? 1);
+    return rounded.a === 1 ? toHexColor(rounded) : toRGBAColor(rounded);
+  } else if (GRADIENT_PAINT_TYPES.has(raw.type)) {
     // treat as GRADIENT_LINEAR
     return {
       type: raw.type,
@@ -308,6 +344,32 @@ export function parsePaint(raw: Paint): SimplifiedFill {
   }
 }
 
+/**
+ * Extract the file key and node ID from a Figma URL
+ *
+ * input: "https://www.figma.com/design/abc123/My-File?node-id=12-34"
+ * output: { fileKey: "abc123", nodeId: "12:34" }
+ *
+ * input: "https://www.figma.com/design/abc123/branch/def456/My-File"
+ * output: { fileKey: "def456", nodeId: undefined }
+ *
+ * @param url - The URL to parse
+ * @returns The file key and node ID, or undefined if the input is not a Figma file URL. For branch
+ * URLs the file key is the branch key, which the API accepts in place of the main file's key.
+ * @throws URIError if the node ID is not validly percent-encoded
+ */
+export function parseFigmaUrl(url: string): { fileKey: string; nodeId?: string } | undefined {
+  const match = FIGMA_URL_PATTERN.exec(url);
+  if (!match) return undefined;
+
+  const [, fileKey, branchKey, nodeId] = match;
+  return {
+    fileKey: branchKey ?? fileKey,
+    // URLs use "-" where the API expects ":" in node IDs
+    nodeId: nodeId ? decodeURIComponent(nodeId).replace(/-/g, ":") : undefined,
+  };
+}
+
 /**
  * Check if an element is visible
  * @param element - The item to check
@@ -4,6 +4,9 @@ import { Logger } from "./logger.js";
 
 const execAsync = promisify(exec);
 
+// Full Figma file responses are often several megabytes, well past exec's 1 MB default
+const CURL_MAX_BUFFER_BYTES = 256 * 1024 * 1024;
+
 type RequestOptions = RequestInit & {
   /**
    * Force format of headers to be a record of strings, e.g. { "Authorization": "Bearer 123" }
@@ -31,12 +34,15 @@ export async function fetchWithRetry<T>(url: string, options: RequestOptions = {
     // -S: Show errors in stderr
     // --fail-with-body: curl errors with code 22, and outputs body of failed request, e.g. "Fetch failed with status 404"
     // -L: Follow redirects
-    const curlCommand = `curl -s -S --fail-with-body -L ${curlHeaders.join(" ")} "${url}"`;
+    // --compressed: Request a gzip/deflate/brotli response and decode it, like fetch does
+    const curlCommand = `curl -s -S --fail-with-body -L --compressed ${curlHeaders.join(" ")} "${url}"`;
 
     try {
       // Fallback to curl for  corporate networks that have proxies that sometimes block fetch
       Logger.log(`[fetchWithRetry] Executing curl command: ${curlCommand}`);
-      const { stdout, stderr } = await execAsync(curlCommand);
+      const { stdout, stderr } = await execAsync(curlCommand, {
+        maxBuffer: CURL_MAX_BUFFER_BYTES,
+      });
 
       if (stderr) {
         // curl often outputs progress to stderr, so only treat as error if stdout is empty
@@ -9,6 +9,8 @@ import type { CSSHexColor, CSSRGBAColor } from "~/services/simplify-node-respons
 
 export { isTruthy };
 
+const AUTO_LAYOUT_MODES: ReadonlySet<string> = new Set(["HORIZONTAL", "VERTICAL"]);
+
 export function hasValue<K extends PropertyKey, T>(
   key: K,
   obj: unknown,
@@ -29,6 +31,10 @@ export function isFrame(val: unknown): val is HasFramePropertiesTrait {
   );
 }
 
+export function isAutoLayoutFrame(val: unknown): val is HasFramePropertiesTrait {
+  return isFrame(val) && AUTO_LAYOUT_MODES.has(val.layoutMode ?? "NONE");
+}
+
 export function isLayout(val: unknown): val is HasLayoutTrait {
   return (
     typeof val === "object" &&
@@ -53,10 +59,8 @@ export function isLayout(val: unknown): val is HasLayoutTrait {
  * @returns True if the node is a child of an auto layout frame, false otherwise.
  */
 export function isInAutoLayoutFlow(node: unknown, parent: unknown): boolean {
-  const autoLayoutModes = ["HORIZONTAL", "VERTICAL"];
   return (
-    isFrame(parent) &&
-    autoLayoutModes.includes(parent.layoutMode ?? "NONE") &&
+    isAutoLayoutFrame(parent) &&
     isLayout(node) &&
     node.layoutPositioning !== "ABSOLUTE"
   );
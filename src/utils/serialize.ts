@@ -0,0 +1,53 @@
+import yaml, { type DumpOptions } from "js-yaml";
+
+/**
+ * Options used for every YAML dump of Figma data.
+ *
+ * - `noRefs` skips js-yaml's duplicate-reference scan, which does a linear `indexOf` over every
+ *   object seen so far and becomes quadratic on large trees. Shared objects are written out in
+ *   full instead of as `&ref`/`*ref` anchors.
+ * - `lineWidth: -1` disables line folding, so long strings are emitted as-is rather than being
+ *   measured and re-wrapped.
+ * - `skipInvalid` drops keys whose value is undefined instead of throwing, matching JSON.stringify,
+ *   so simplified data does not need a pruning pass before it is dumped.
+ */
+export const YAML_DUMP_OPTIONS: DumpOptions = {
+  noRefs: true,
+  lineWidth: -1,
+  skipInvalid: true,
+};
+
+/**
+ * Serialize a value to YAML using the shared dump options
+ * @param value - The value to serialize
+ * @returns The YAML string
+ */
+export function toYaml(value: unknown): string {
+  return yaml.dump(value, YAML_DUMP_OPTIONS);
+}
+
+/**
+ * Output formats supported by the tools.
+ *
+ * - `yaml`: the default, smallest in tokens
+ * - `json`: pretty-printed JSON
+ * - `fastjson`: compact JSON without indentation, the cheapest to encode for very large designs
+ */
+export type OutputFormat = "yaml" | "json" | "fastjson";
+
+/**
+ * Serialize a tool result in the requested output format
+ * @param value - The value to serialize
+ * @param format - The output format
+ * @returns The serialized string
+ */
+export function serializeResult(value: unknown, format: OutputFormat): string {
+  switch (format) {
+    case "json":
+      return JSON.stringify(value, null, 2);
+    case "fastjson":
+      return JSON.stringify(value);
+    default:
+      return toYaml(value);
+  }
+}